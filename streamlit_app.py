@@ -1,5 +1,153 @@
+import hashlib
+import io
+
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv
+
+# Least to most budget; sorting descending lists increases first
+BUDGET_ACTIONS = ["🟥 Decrease Budget", "🟨 Slight Increase", "🟩 Increase Budget"]
+
+LARGE_UPLOAD_BYTES = 50 * 1024 * 1024
+CHUNK_ROWS = 100_000
+REPORT_COLUMNS = ['Campaign', 'Budget', 'Clicks', 'Conversions', 'Cost / conv.', 'CTR', 'Conv. rate']
+
+# Dekker's splitter for doubles: x * (2**27 + 1) splits x into two halves whose products are exact
+DEKKER_SPLIT = 2**27 + 1
+
+
+def round_cents(x):
+    # Matches builtin round(x, 2), which np.rint(x * 100) misses on float-error .5 ties
+    cents = x * 100
+    split = x * DEKKER_SPLIT
+    hi = split - (split - x)
+    lo = x - hi
+    err = (hi * 100 - cents) + lo * 100
+    tie = cents - np.floor(cents) == 0.5
+    return np.where(
+        tie & (err > 0), np.ceil(cents),
+        np.where(tie & (err < 0), np.floor(cents), np.rint(cents))
+    ) / 100
+
+
+def read_report(file_bytes):
+    # '--' is Google Ads' placeholder for "no data"; treat it as null while parsing
+    if len(file_bytes) > LARGE_UPLOAD_BYTES:
+        return pd.read_csv(
+            io.BytesIO(file_bytes), skiprows=2, na_values=['--'], index_col=False,
+            usecols=lambda name: name in REPORT_COLUMNS, chunksize=CHUNK_ROWS
+        )
+    # Drop the two-line report title/date-range preamble ourselves: pyarrow still
+    # tokenizes skipped rows and rejects the date range's unquoted commas
+    body = io.BytesIO(file_bytes.split(b'\n', 2)[-1])
+    try:
+        return [pd.read_csv(body, na_values=['--'], engine='pyarrow', dtype_backend='pyarrow')]
+    except (TypeError, ValueError):
+        return [pd.read_csv(io.BytesIO(file_bytes), skiprows=2, na_values=['--'], index_col=False)]
+
+
+def clean_metrics(df):
+    for col in ['Conversions', 'Cost / conv.', 'CTR', 'Clicks', 'Conv. rate', 'Budget']:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(
+                values.astype(pd.ArrowDtype(pa.string())).str.replace(r'--|[%\s]', '', regex=True),
+                errors='coerce'
+            )
+        # Arrow-backed floats keep unparsable values as NaN, which notna()/mean() don't treat as missing
+        df[col] = values.to_numpy(dtype=float, na_value=np.nan)
+    return df
+
+
+def clean_report(df_raw):
+    campaign = df_raw['Campaign']
+    if not pd.api.types.is_string_dtype(campaign.dtype):
+        raise ValueError("The 'Campaign' column does not contain text; check the report's column layout")
+    df_raw['Campaign'] = campaign.astype(pd.ArrowDtype(pa.string()))
+
+    campaign = df_raw['Campaign']
+    is_total = campaign.str.startswith("Total", na=False).to_numpy(dtype=bool)
+    is_account_total = (campaign == 'Total: Account').to_numpy(dtype=bool, na_value=False)
+    df = clean_metrics(df_raw.iloc[~is_total].copy())
+    avg_row = df_raw.iloc[is_account_total]
+
+    complete = df[['Conversions', 'Cost / conv.', 'CTR', 'Budget']].notna().all(axis=1).to_numpy(dtype=bool)
+    return df.take(complete.nonzero()[0]), avg_row
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def process_csv(file_bytes):
+    parts = [clean_report(chunk) for chunk in read_report(file_bytes)]
+    if len(parts) == 1:
+        df, avg_row = parts[0]
+    else:
+        df = pd.concat([rows for rows, _ in parts])
+        avg_row = pd.concat([totals for _, totals in parts])
+
+    if avg_row.empty:
+        avg_conversions = df['Conversions'].mean()
+        avg_cpa = df['Cost / conv.'].mean()
+        avg_ctr = df['CTR'].mean()
+        avg_conv_rate = df['Conv. rate'].mean() / 100
+    else:
+        avg_vals = pd.to_numeric(
+            avg_row.iloc[0][['Conversions', 'Cost / conv.', 'CTR', 'Conv. rate']].replace('%', '', regex=True),
+            errors='coerce'
+        ).to_numpy(dtype=float)
+        avg_conversions, avg_cpa, avg_ctr, avg_conv_rate = avg_vals
+        avg_conv_rate /= 100
+
+    df['Expected Conversions'] = round_cents(df['Clicks'].fillna(0).to_numpy(dtype=float) * avg_conv_rate)
+
+    conv = df['Conversions'].to_numpy(dtype=float)
+    cpa = df['Cost / conv.'].to_numpy(dtype=float)
+    ctr = df['CTR'].to_numpy(dtype=float)
+    budget = df['Budget'].to_numpy(dtype=float)
+
+    recommendations = [
+        ("🟥 Decrease Budget", "Underperforming on all key metrics", 0.8),
+        ("🟥 Decrease Budget", "Avg conversions, high cost, low CTR", 0.8),
+        ("🟨 Slight Increase", "Avg conversions, good CTR may drive gains", 1.1),
+        ("🟥 Decrease Budget", "Near-average performance with inefficiencies", 0.8),
+        ("🟩 Increase Budget", "High conversions, low cost, high CTR", 1.2),
+        ("🟥 Decrease Budget", "Performance not clearly above average", 0.8),
+    ]
+
+    cpa_high = cpa > avg_cpa
+    ctr_low = ctr < avg_ctr
+    ctr_high = ctr > avg_ctr
+    near_avg = np.abs(conv - avg_conversions) / avg_conversions <= 0.05
+    bucket = np.where(
+        (conv < avg_conversions) & cpa_high & ctr_low, 0,
+        np.where(
+            near_avg,
+            np.where(cpa_high & ctr_low, 1, np.where(cpa_high & ctr_high, 2, 3)),
+            np.where((conv > avg_conversions) & (cpa < avg_cpa) & ctr_high, 4, 5)
+        )
+    )
+
+    actions, reasons, multipliers = zip(*recommendations)
+    action_codes = np.array([BUDGET_ACTIONS.index(action) for action in actions])
+    multipliers = np.array(multipliers)
+
+    df[['Budget Action', 'Reason', 'Suggested Budget']] = pd.DataFrame({
+        'Budget Action': pd.Categorical.from_codes(action_codes[bucket], categories=BUDGET_ACTIONS, ordered=True),
+        'Reason': pd.Categorical.from_codes(bucket, categories=reasons),
+        'Suggested Budget': round_cents(budget * multipliers[bucket]),
+    }, index=df.index)
+
+    return df.sort_values('Budget Action', ascending=False, kind='stable')
+
+
+def to_csv_bytes(df):
+    buf = io.BytesIO()
+    pa.csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue()
+
 
 st.set_page_config("Campaign Budget Allocator", layout="wide")
 st.title("📊 Campaign Budget Allocation Advisor")
@@ -8,88 +156,25 @@ uploaded_file = st.file_uploader("Upload your campaign performance CSV (e.g. fro
 
 if uploaded_file:
     try:
-        df_raw = pd.read_csv(uploaded_file, skiprows=2)
-        df = df_raw[~df_raw['Campaign'].str.contains("Total", na=False)].copy()
-
-        clean_columns = ['Conversions', 'Cost / conv.', 'CTR', 'Clicks', 'Conv. rate', 'Budget']
-
-        for col in clean_columns:
-            if col in df.columns:
-                df[col] = (
-                    df[col]
-                    .astype(str)
-                    .str.replace('--', '', regex=False)
-                    .str.replace('%', '', regex=False)
-                    .str.strip()
-                )
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        df.dropna(subset=['Conversions', 'Cost / conv.', 'CTR', 'Budget'], inplace=True)
-
-        avg_row = df_raw[df_raw['Campaign'] == 'Total: Account']
-        if avg_row.empty:
-            avg_conversions = df['Conversions'].mean()
-            avg_cpa = df['Cost / conv.'].mean()
-            avg_ctr = df['CTR'].mean()
-            avg_conv_rate = df['Conv. rate'].mean() / 100
-        else:
-            avg_conversions = pd.to_numeric(avg_row['Conversions'], errors='coerce').values[0]
-            avg_cpa = pd.to_numeric(avg_row['Cost / conv.'], errors='coerce').values[0]
-            avg_ctr = pd.to_numeric(avg_row['CTR'].astype(str).str.replace('%', ''), errors='coerce').values[0]
-            avg_conv_rate = pd.to_numeric(avg_row['Conv. rate'].astype(str).str.replace('%', ''), errors='coerce').values[0] / 100
-
-        def get_recommendation(row):
-            conv = row['Conversions']
-            cpa = row['Cost / conv.']
-            ctr = row['CTR']
-            clicks = row.get('Clicks', 0) or 0
-            budget = row['Budget']
-
-            if conv < avg_conversions and cpa > avg_cpa and ctr < avg_ctr:
-                action = "🟥 Decrease Budget"
-                reason = "Underperforming on all key metrics"
-                new_budget = round(budget * 0.8, 2)
-            elif abs(conv - avg_conversions) / avg_conversions <= 0.05:
-                if cpa > avg_cpa and ctr < avg_ctr:
-                    action = "🟥 Decrease Budget"
-                    reason = "Avg conversions, high cost, low CTR"
-                    new_budget = round(budget * 0.8, 2)
-                elif cpa > avg_cpa and ctr > avg_ctr:
-                    action = "🟨 Slight Increase"
-                    reason = "Avg conversions, good CTR may drive gains"
-                    new_budget = round(budget * 1.1, 2)
-                else:
-                    action = "🟥 Decrease Budget"
-                    reason = "Near-average performance with inefficiencies"
-                    new_budget = round(budget * 0.8, 2)
-            elif conv > avg_conversions and cpa < avg_cpa and ctr > avg_ctr:
-                action = "🟩 Increase Budget"
-                reason = "High conversions, low cost, high CTR"
-                new_budget = round(budget * 1.2, 2)
-            else:
-                action = "🟥 Decrease Budget"
-                reason = "Performance not clearly above average"
-                new_budget = round(budget * 0.8, 2)
-
-            return pd.Series({
-                "Budget Action": action,
-                "Reason": reason,
-                "Suggested Budget": new_budget
-            })
-
-        df[['Budget Action', 'Reason', 'Suggested Budget']] = df.apply(get_recommendation, axis=1)
-
         display_cols = [
-            'Campaign', 'Budget', 'Suggested Budget', 'Conversions',
+            'Campaign', 'Budget', 'Suggested Budget', 'Expected Conversions', 'Conversions',
             'Cost / conv.', 'CTR', 'Clicks', 'Budget Action', 'Reason'
         ]
 
+        file_hash = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).digest()
+        if st.session_state.get('last_hash') != file_hash:
+            result = process_csv(uploaded_file.getvalue())[display_cols].reset_index(drop=True)
+            st.session_state['result_df'] = result
+            st.session_state['result_csv'] = to_csv_bytes(result)
+            st.session_state['last_hash'] = file_hash
+        df = st.session_state['result_df']
+
         st.subheader("📋 Budget Recommendations")
-        st.dataframe(df[display_cols].sort_values('Budget Action', ascending=False).reset_index(drop=True), use_container_width=True)
+        st.dataframe(df, use_container_width=True)
 
         st.download_button(
             label="📩 Download Recommendations CSV",
-            data=df[display_cols].to_csv(index=False),
+            data=st.session_state['result_csv'],
             file_name="campaign_budget_recommendations.csv",
             mime="text/csv"
         )
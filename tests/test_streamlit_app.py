@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_app
+
+PREAMBLE = b"Campaign performance\nJanuary 1, 2024 - January 31, 2024\n"
+HEADER = b"Campaign,Budget,Clicks,Conversions,Cost / conv.,CTR,Conv. rate\n"
+ROWS = (
+    b"Brand,100.00,200,40,5.00,8.00%,20.00%\n"
+    b"AvgCamp,100.00,100,20,10.00,5.00%,20.00%\n"
+    b"Slight,100.00,50,10,15.00,3.00%,20.00%\n"
+)
+
+
+# Averages from the account row: 20 conversions, 10.00 cost/conv., 5% CTR
+ACCOUNT_ROW = b"Total: Account,,,20,10.00,5.00%,10.00%\n"
+
+RULE_CASES = [
+    (b"Under,100.00,10,10,15.00,3.00%,10.00%", "🟥 Decrease Budget", "Underperforming on all key metrics", 80),
+    (b"NearLowCtr,100.00,10,20,15.00,3.00%,10.00%", "🟥 Decrease Budget", "Avg conversions, high cost, low CTR", 80),
+    (b"NearHighCtr,100.00,10,20.5,15.00,8.00%,10.00%", "🟨 Slight Increase",
+     "Avg conversions, good CTR may drive gains", 110),
+    (b"NearCheap,100.00,10,20,5.00,8.00%,10.00%", "🟥 Decrease Budget",
+     "Near-average performance with inefficiencies", 80),
+    (b"High,100.00,10,40,5.00,8.00%,10.00%", "🟩 Increase Budget", "High conversions, low cost, high CTR", 120),
+    (b"Mixed,100.00,10,40,15.00,8.00%,10.00%", "🟥 Decrease Budget", "Performance not clearly above average", 80),
+    # A CTR equal to the average is neither low nor high
+    (b"CtrAtAvg,100.00,10,20,15.00,5.00%,10.00%", "🟥 Decrease Budget",
+     "Near-average performance with inefficiencies", 80),
+]
+
+
+def process(report):
+    return streamlit_app.process_csv.__wrapped__(report)
+
+
+def test_ragged_row_keeps_columns_aligned():
+    report = PREAMBLE + HEADER + b"A,100.00,10,20,10.00,5.00%,20.00%,extra\n" + ROWS
+    df = process(report)
+    assert df.set_index('Campaign')['Conversions'].to_dict() == {'A': 20, 'Brand': 40, 'AvgCamp': 20, 'Slight': 10}
+    assert (df['Budget'] == 100).all()
+
+
+def test_non_text_campaign_column_is_rejected():
+    report = PREAMBLE + HEADER + b"101,100.00,10,20,10.00,5.00%,20.00%\n102,100.00,10,20,10.00,5.00%,20.00%\n"
+    with pytest.raises(ValueError, match="Campaign"):
+        process(report)
+
+
+def test_unparsable_budget_row_is_dropped():
+    report = PREAMBLE + HEADER + ROWS + b'Bad,"1,000",10,5,12.00,4.00%,10.00%\n'
+    df = process(report)
+    assert sorted(df['Campaign']) == ['AvgCamp', 'Brand', 'Slight']
+
+
+def test_unparsable_cost_per_conv_keeps_averages():
+    baseline = process(PREAMBLE + HEADER + ROWS)
+    report = PREAMBLE + HEADER + ROWS + b'Bad,100.00,10,5,"1,234.50",4.00%,10.00%\n'
+    df = process(report)
+    assert df.set_index('Campaign')['Budget Action'].astype(str).to_dict() == \
+        baseline.set_index('Campaign')['Budget Action'].astype(str).to_dict()
+    assert df['Suggested Budget'].notna().all()
+
+
+@pytest.mark.parametrize("row, action, reason, suggested", RULE_CASES)
+def test_recommendation_rules(row, action, reason, suggested):
+    df = process(PREAMBLE + HEADER + row + b"\n" + ACCOUNT_ROW)
+    assert df['Budget Action'].iloc[0] == action
+    assert df['Reason'].iloc[0] == reason
+    assert df['Suggested Budget'].iloc[0] == suggested
+
+
+def test_missing_account_average_falls_through():
+    account_row = b"Total: Account,,,--,10.00,5.00%,10.00%\n"
+    df = process(PREAMBLE + HEADER + RULE_CASES[4][0] + b"\n" + account_row)
+    assert df['Reason'].iloc[0] == "Performance not clearly above average"
+
+
+def test_budget_actions_sorted_increase_first():
+    rows = b"".join(row + b"\n" for row, *_ in RULE_CASES)
+    df = process(PREAMBLE + HEADER + rows + ACCOUNT_ROW)
+    assert list(df['Budget Action'].astype(str)) == ["🟩 Increase Budget", "🟨 Slight Increase"] + ["🟥 Decrease Budget"] * 5
+    assert list(df['Campaign'].iloc[2:]) == ['Under', 'NearLowCtr', 'NearCheap', 'Mixed', 'CtrAtAvg']
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 3, 100])
+def test_chunked_parse_matches_single_pass(monkeypatch, chunk_rows):
+    rows = b"".join(row + b"\n" for row, *_ in RULE_CASES)
+    report = (
+        PREAMBLE + HEADER + ROWS + rows + b'Bad,"1,000",10,5,12.00,4.00%,10.00%\n'
+        + b"Missing,100.00,10,--,12.00,4.00%,10.00%\n" + b"Total: Campaigns,900.00,,,,,\n" + ACCOUNT_ROW
+    )
+    single = process(report)
+    monkeypatch.setattr(streamlit_app, 'LARGE_UPLOAD_BYTES', 0)
+    monkeypatch.setattr(streamlit_app, 'CHUNK_ROWS', chunk_rows)
+    chunked = process(report)
+    pd.testing.assert_frame_equal(chunked, single[chunked.columns])
+
+
+def test_round_cents_matches_builtin_round():
+    # 5309.15 * 1.1 is 5840.0650000000005: np.rint(x * 100) lands on an exact .5 and rounds down
+    assert streamlit_app.round_cents(np.array([5309.15 * 1.1]))[0] == 5840.07
+    # A true tie still rounds half to even
+    assert streamlit_app.round_cents(np.array([0.125]))[0] == 0.12
+
+    rng = np.random.default_rng(0)
+    values = np.round(rng.uniform(0, 10_000, 200_000), 2) * rng.choice([0.8, 1.1, 1.2], 200_000)
+    assert (streamlit_app.round_cents(values) == [round(v, 2) for v in values.tolist()]).all()